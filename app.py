@@ -3,14 +3,32 @@ import os
 import json
 import subprocess
 import datetime
+import time
 import shutil
+import stat
+import struct
+import threading
 import hashlib
+import mmap
 import difflib
+import fnmatch
+import functools
+import re
+import concurrent.futures
+
+try:
+    import orjson  # optional: much faster JSON encode/decode
+except ImportError:
+    orjson = None
 
 # ------------------ CONSTANTS ------------------
 
 FOLDER_NAME = ".repoflow"
 IGNORE_FILE = ".repoflowignore"
+TRASH_SUFFIX = ".trash."
+
+# hashlib's sha256 is backed by OpenSSL, which uses SHA-NI where available
+HASH_ALGORITHM = "sha256"
 
 DEFAULT_IGNORES = [
     # --- Version Control ---
@@ -68,11 +86,44 @@ def hide_folder_windows(path):
 
     subprocess.run(["attrib", "+H", path], shell=True)
 
-    for root, dirs, files in os.walk(path):
-        for d in dirs:
-            subprocess.run(["attrib", "+H", os.path.join(root, d)], shell=True)
-        for f in files:
-            subprocess.run(["attrib", "+H", os.path.join(root, f)], shell=True)
+    # one process hides everything below path: /S recurses, /D includes dirs
+    subprocess.run(["attrib", "+H", "/S", "/D", os.path.join(path, "*")], shell=True)
+
+
+def fast_copy(src, dst):
+    """
+    Copy a file, keeping its mode and mtime.
+    On Linux the data is copied in-kernel with copy_file_range, which
+    also reflinks on filesystems that support it (btrfs, xfs).
+    """
+    st = os.stat(src)
+
+    copied = False
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                # st_size can be stale or 0 (procfs), so copy until EOF
+                blocksize = max(st.st_size, 8 * 1024 * 1024)
+                total = 0
+                while True:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), blocksize)
+                    if n == 0:
+                        break
+                    total += n
+
+            # nothing copied: an empty file, or a filesystem (FUSE, procfs,
+            # some cross-fs copies) where copy_file_range silently does
+            # nothing; let copyfile read it the ordinary way
+            copied = total > 0
+        except OSError:
+            pass
+
+    # sendfile / fcopyfile / CopyFile via the stdlib
+    if not copied:
+        shutil.copyfile(src, dst)
+
+    os.chmod(dst, stat.S_IMODE(st.st_mode))
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
 
 
 # ------------------ IGNORE SYSTEM ------------------
@@ -84,7 +135,137 @@ def load_ignore_rules(project_dir):
     with open(ignore_path, "r") as f:
         return [line.strip() for line in f if line.strip()]
 
-def should_ignore(rel_path, ignore_rules):
+class PrefixTrie:
+    """
+    Trie over path segments ("a/b/" -> ["a", "b"]).
+    Answers "is any leading directory of this path in the trie?" in
+    O(segments), independent of how many rules were inserted.
+    """
+
+    # "/" can never be a path segment, so it is safe as the end marker
+    END = "/"
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, segments):
+        node = self.root
+        for segment in segments:
+            node = node.setdefault(segment, {})
+        node[self.END] = True
+
+    def covers(self, segments, include_self=False):
+        """
+        True if a proper prefix of segments was inserted (or segments
+        itself, with include_self=True).
+        """
+        node = self.root
+        depth = len(segments) if include_self else len(segments) - 1
+        for segment in segments[:depth]:
+            node = node.get(segment)
+            if node is None:
+                return False
+            if self.END in node:
+                return True
+        return False
+
+def compile_ignore_matcher(rules):
+    """
+    Compile ignore rules into lookup structures, so each check costs
+    O(path segments) instead of O(rules):
+      - "dir/" rules    -> PrefixTrie over path segments
+      - literal rules   -> set of exact paths / names
+      - "*suffix" rules -> tuple for str.endswith
+      - other globs     -> one regex over the path, one over the name
+
+    Returns a memoized callable: matcher(rel_path, is_dir=False) -> bool
+    With is_dir=True it is also True when a "dir/" rule covers everything
+    below rel_path, so the walk can skip the directory entirely.
+    """
+    dir_trie = PrefixTrie()
+    literals = set()
+    suffixes = []
+    path_globs = []
+    name_globs = []
+
+    for rule in rules:
+        rule = normalize(rule)
+
+        # exact path or exact name
+        literals.add(rule)
+
+        # "dir/" ignores everything below dir
+        if rule.endswith("/"):
+            dir_trie.insert(rule[:-1].split("/"))
+
+        # "*suffix" ignores names ending in suffix; a plain suffix needs
+        # only str.endswith, so it stays out of the glob regexes
+        if rule.startswith("*") and not any(c in rule[1:] for c in "*?[/"):
+            suffixes.append(rule[1:])
+
+        # shell globs, matched against the path if they contain a slash
+        elif any(c in rule for c in "*?["):
+            if "/" in rule.rstrip("/"):
+                path_globs.append(fnmatch.translate(rule))
+            else:
+                name_globs.append(fnmatch.translate(rule))
+
+    suffixes = tuple(suffixes)
+
+    def join(patterns):
+        if not patterns:
+            return lambda _: None
+        return re.compile("|".join(f"(?:{p})" for p in patterns), re.DOTALL).fullmatch
+
+    path_glob_match = join(path_globs)
+    name_glob_match = join(name_globs)
+
+    # only these rules need the joined path; a path never ends in "/"
+    path_literals = {r for r in literals if "/" in r and not r.endswith("/")}
+    needs_path = bool(path_literals or path_globs)
+
+    def match_segments(segments, rel_path=None, is_dir=False):
+        name = segments[-1]
+
+        if name in literals:
+            return True
+        if suffixes and name.endswith(suffixes):
+            return True
+        if dir_trie.covers(segments, include_self=is_dir):
+            return True
+        if name_glob_match(name):
+            return True
+
+        if needs_path:
+            if rel_path is None:
+                rel_path = "/".join(segments)
+            return rel_path in path_literals or bool(path_glob_match(rel_path))
+        return False
+
+    @functools.lru_cache(maxsize=65536)
+    def matcher(rel_path, is_dir=False):
+        return match_segments(rel_path.split("/"), rel_path, is_dir)
+
+    # uncached entry point for the tree walk, which already has segments
+    matcher.match_segments = match_segments
+    return matcher
+
+# (project_dir, ignore file mtime) -> compiled matcher
+_IGNORE_MATCHERS = {}
+
+def load_ignore_matcher(project_dir):
+    ignore_path = os.path.join(project_dir, IGNORE_FILE)
+    try:
+        mtime_ns = os.stat(ignore_path).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+
+    key = (project_dir, mtime_ns)
+    if key not in _IGNORE_MATCHERS:
+        _IGNORE_MATCHERS[key] = compile_ignore_matcher(load_ignore_rules(project_dir))
+    return _IGNORE_MATCHERS[key]
+
+def should_ignore(rel_path, matcher, is_dir=False):
     rel_path = normalize(rel_path)
 
     # 🔥 absolute hard rules
@@ -92,71 +273,251 @@ def should_ignore(rel_path, ignore_rules):
         return True
     if rel_path.startswith(".repoflow/") or rel_path == ".repoflow":
         return True
+    if rel_path.startswith(FOLDER_NAME + TRASH_SUFFIX):
+        return True
 
-    name = os.path.basename(rel_path)
-
-    for rule in ignore_rules:
-        rule = normalize(rule)
+    return matcher(rel_path, is_dir)
 
-        if rule.endswith("/") and rel_path.startswith(rule[:-1] + "/"):
+def should_ignore_with_parents(rel_path, matcher):
+    """
+    Like should_ignore, but also True when any parent directory is ignored
+    (what the os.walk pruning in collect_files would have skipped).
+    """
+    parts = normalize(rel_path).split("/")
+    for i in range(1, len(parts)):
+        if should_ignore("/".join(parts[:i]), matcher, is_dir=True):
             return True
+    return should_ignore(rel_path, matcher)
 
-        if rule.startswith("*") and name.endswith(rule[1:]):
-            return True
+# ------------------ FILE COLLECTION ------------------
 
-        if rel_path == rule or name == rule:
-            return True
+# trees smaller than this are walked on the calling thread
+PARALLEL_WALK_THRESHOLD = 1000
+WALK_WORKERS = 8
 
-    return False
+def scan_dir(abs_dir, rel_dir, segments, matcher):
+    """
+    List one directory.
+    segments is rel_dir split on "/" (a tuple), carried down the walk so
+    ignore checks don't re-split or re-normalize joined paths.
 
-# ------------------ FILE COLLECTION ------------------
+    Returns (files, subdirs, entry_count): files is [(rel_path, stat_result)]
+    and subdirs is [(abs_path, rel_path, segments)] of directories still to walk.
+    """
+    try:
+        with os.scandir(abs_dir) as it:
+            entries = list(it)
+    except OSError:
+        return [], [], 0
+
+    match_segments = matcher.match_segments
+    prefix = f"{rel_dir}/" if rel_dir else ""
+
+    files = []
+    subdirs = []
+    for entry in entries:
+        name = entry.name
+
+        # 🔥 absolute hard rules (see should_ignore)
+        if not segments and (
+            name in (".git", FOLDER_NAME) or name.startswith(FOLDER_NAME + TRASH_SUFFIX)
+        ):
+            continue
+
+        entry_segments = segments + (name,)
+
+        if entry.is_dir(follow_symlinks=False):
+            if name == FOLDER_NAME:
+                continue
+            if not match_segments(entry_segments, is_dir=True):
+                subdirs.append((entry.path, prefix + name, entry_segments))
+
+        # follows symlinks, like os.path.isfile
+        elif entry.is_file() and not match_segments(entry_segments):
+            try:
+                files.append((prefix + name, entry.stat()))
+            except OSError:
+                pass
+
+    return files, subdirs, len(entries)
+
+def collect_file_stats(project_dir):
+    """
+    Walk project_dir with os.scandir.
+    Returns relative_path -> os.stat_result for every non-ignored file,
+    so callers don't have to stat each file again.
+
+    Large trees are listed by a pool of threads so readdir/stat calls
+    overlap; the result keeps os.walk order either way.
+    """
+    matcher = load_ignore_matcher(project_dir)
+
+    # rel_dir -> (files, subdirs)
+    listings = {}
+    pending = [(project_dir, "", ())]
+    entries_seen = 0
+
+    while pending and entries_seen < PARALLEL_WALK_THRESHOLD:
+        abs_dir, rel_dir, segments = pending.pop()
+        files, subdirs, count = scan_dir(abs_dir, rel_dir, segments, matcher)
+        listings[rel_dir] = (files, subdirs)
+        pending.extend(subdirs)
+        entries_seen += count
+
+    if pending:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=WALK_WORKERS) as executor:
+            futures = {
+                executor.submit(scan_dir, abs_dir, rel_dir, segments, matcher): rel_dir
+                for abs_dir, rel_dir, segments in pending
+            }
+            while futures:
+                done, _ = concurrent.futures.wait(
+                    futures, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    rel_dir = futures.pop(future)
+                    files, subdirs, _ = future.result()
+                    listings[rel_dir] = (files, subdirs)
+                    for sub_abs, sub_rel, sub_segments in subdirs:
+                        future = executor.submit(scan_dir, sub_abs, sub_rel, sub_segments, matcher)
+                        futures[future] = sub_rel
+
+    # files first, then subdirectories (same order as os.walk)
+    included = {}
+    stack = [""]
+    while stack:
+        files, subdirs = listings[stack.pop()]
+        included.update(files)
+        stack.extend(sub_rel for _, sub_rel, _ in reversed(subdirs))
+
+    return included
 
 def collect_files(project_dir):
-    ignore_rules = load_ignore_rules(project_dir)
-    included = []
+    return list(collect_file_stats(project_dir))
+
+# ------------------ OBJECT STORE ------------------
+
+def object_path(repo_path, file_hash):
+    return os.path.join(repo_path, "objects", file_hash[:2], file_hash[2:])
+
+def store_object(repo_path, src, entry):
+    """
+    Store src in objects/ under its hash and return the hash used.
+    entry is src's state entry (or bare hash) from when it was hashed.
+    Each content is written once; existing objects are left alone.
+    """
+    file_hash = entry_hash(entry)
+    dst = object_path(repo_path, file_hash)
+    if os.path.exists(dst):
+        return file_hash
 
-    for root, dirs, files in os.walk(project_dir):
-        rel_root = normalize(os.path.relpath(root, project_dir))
-        if rel_root == ".":
-            rel_root = ""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
 
-        dirs[:] = [
-            d for d in dirs
-            if not should_ignore(normalize(os.path.join(rel_root, d)), ignore_rules)
-        ]
+    # copy to a temp name first so a half-written object is never visible
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    fast_copy(src, tmp_path)
 
-        if FOLDER_NAME in dirs:
-            dirs.remove(FOLDER_NAME)
+    # src may have been written to since it was hashed. If its stat no
+    # longer matches the entry (or was too recent to trust), key the
+    # object by the bytes actually copied, never by the stale hash.
+    try:
+        st = os.stat(src)
+        unchanged = (
+            isinstance(entry, dict)
+            and entry.get("mtime_ns") == st.st_mtime_ns
+            and entry.get("size") == st.st_size
+        )
+    except OSError:
+        unchanged = False
+
+    if not unchanged:
+        file_hash = compute_file_hash(tmp_path)
+        dst = object_path(repo_path, file_hash)
+        if os.path.exists(dst):
+            os.remove(tmp_path)
+            return file_hash
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+    os.replace(tmp_path, dst)
+    return file_hash
+
+def manifest_path(repo_path, name):
+    return os.path.join(repo_path, "commits", f"{name}.json")
+
+def load_manifest(repo_path, name):
+    """
+    Load commits/<name>.json (relative_path -> file_hash).
+    Returns None if the snapshot does not exist.
+    """
+    migrate_snapshot_dir(repo_path, name)
+
+    path = manifest_path(repo_path, name)
+    if not os.path.exists(path):
+        return None
+    return load_json(path)
+
+def save_manifest(repo_path, name, manifest):
+    os.makedirs(os.path.join(repo_path, "commits"), exist_ok=True)
+    atomic_write_json(manifest_path(repo_path, name), manifest)
+
+def migrate_snapshot_dir(repo_path, name):
+    """
+    Convert an old full-copy snapshot (commits/<name>/) into objects + manifest.
+    """
+    snapshot_dir = os.path.join(repo_path, "commits", name)
+    if not os.path.isdir(snapshot_dir) or os.path.exists(manifest_path(repo_path, name)):
+        return
 
+    rel_paths = []
+    for root, _, files in os.walk(snapshot_dir):
         for file in files:
-            rel_path = normalize(os.path.join(rel_root, file))
-            if not should_ignore(rel_path, ignore_rules):
-                included.append(rel_path)
+            rel_paths.append(normalize(os.path.relpath(os.path.join(root, file), snapshot_dir)))
 
-    return included
+    manifest = {}
+    for rel_path, entry in hash_files(snapshot_dir, rel_paths).items():
+        manifest[rel_path] = store_object(repo_path, os.path.join(snapshot_dir, rel_path), entry)
+
+    save_manifest(repo_path, name, manifest)
+    shutil.rmtree(snapshot_dir)
+
+def materialize(repo_path, file_hash, dst):
+    """Copy an object out of the store to dst."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    fast_copy(object_path(repo_path, file_hash), dst)
 
 # ------------------ BASE SNAPSHOT ------------------
 
-def copy_base_snapshot(project_dir, files):
-    base_dir = os.path.join(project_dir, FOLDER_NAME, "commits", "base")
+def copy_base_snapshot(project_dir, state):
+    repo_path = os.path.join(project_dir, FOLDER_NAME)
+    manifest = {}
 
-    for rel_path in files:
+    for rel_path, entry in state.items():
         src = os.path.join(project_dir, rel_path)
-        dst = os.path.join(base_dir, rel_path)
+        manifest[rel_path] = store_object(repo_path, src, entry)
 
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        shutil.copy2(src, dst)
+    save_manifest(repo_path, "base", manifest)
 
 # ------------------ INIT ------------------
-def atomic_write_json(path, data):
+def atomic_write_bytes(path, payload):
     """
-    Safely write JSON on Windows by using a temp file + replace.
+    Safely write a file on Windows by using a temp file + replace.
+    The temp name is unique per process/thread, so concurrent writers
+    never share (or clobber) one temp file.
     """
-    tmp_path = path + ".tmp"
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
 
-    # write to temp file first
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    # write to temp file first, in as few syscalls as possible
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    fd = os.open(tmp_path, flags, 0o666)
+    try:
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(fd, view):]
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    os.close(fd)
 
     # ensure old file is removable
     if os.path.exists(path):
@@ -166,34 +527,67 @@ def atomic_write_json(path, data):
             pass
 
     # atomic replace (Windows-safe)
-    os.replace(tmp_path, path)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def dump_json(data):
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=4).encode("utf-8")
+
+def dump_json_line(data):
+    """Compact single-line JSON, newline-terminated (for .jsonl files)."""
+    if orjson is not None:
+        return orjson.dumps(data) + b"\n"
+    return json.dumps(data).encode("utf-8") + b"\n"
+
+def parse_json(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def load_json(path):
+    with open(path, "rb") as f:
+        return parse_json(f.read())
+
+def atomic_write_json(path, data):
+    atomic_write_bytes(path, dump_json(data))
 
 def init_repo(force=False):
     project_dir = os.getcwd()
     repo_path = os.path.join(project_dir, FOLDER_NAME)
     ignore_path = os.path.join(project_dir, IGNORE_FILE)
 
+    sweep_trash(project_dir)
+
     if force and os.path.exists(repo_path):
         print("Reinitializing RepoFlow...")
         force_remove(repo_path)
 
     if force and os.path.exists(repo_path):
-        shutil.rmtree(os.path.join(repo_path, "commits", "base"))
-        os.makedirs(os.path.join(repo_path, "commits", "base"))
+        base_manifest = manifest_path(repo_path, "base")
+        if os.path.exists(base_manifest):
+            os.remove(base_manifest)
         print("Reinitializing RepoFlow...")
 
     if not os.path.exists(repo_path):
-        os.makedirs(os.path.join(repo_path, "commits", "base"))
+        os.makedirs(os.path.join(repo_path, "commits"))
+        os.makedirs(os.path.join(repo_path, "objects"))
         os.makedirs(os.path.join(repo_path, "diffs"))
 
     if not os.path.exists(ignore_path):
         with open(ignore_path, "w") as f:
             f.write("\n".join(DEFAULT_IGNORES))
 
-    files = collect_files(project_dir)
-    copy_base_snapshot(project_dir, files)
+    stats = collect_file_stats(project_dir)
+    files = list(stats)
 
-    build_state(project_dir, files)
+    # the hashes double as object keys for the base snapshot
+    state = build_state(project_dir, files, stats)
+    copy_base_snapshot(project_dir, state)
 
     metadata = {
         "project_dir": project_dir,
@@ -203,52 +597,75 @@ def init_repo(force=False):
         "files_included": files
     }
 
-    with open(os.path.join(repo_path, "metadata.json"), "w") as f:
-        json.dump(metadata, f, indent=4)
-
-    with open(os.path.join(repo_path, "log.json"), "w") as f:
-        json.dump([], f)
-
-    with open(os.path.join(repo_path, "config.json"), "w") as f:
-        json.dump({"version": "1.0"}, f)
+    atomic_write_json(os.path.join(repo_path, "metadata.json"), metadata)
+    atomic_write_bytes(os.path.join(repo_path, "log.jsonl"), b"")
+    atomic_write_json(
+        os.path.join(repo_path, "config.json"),
+        {"version": "1.0", "hash_algorithm": HASH_ALGORITHM}
+    )
 
     hide_folder_windows(repo_path)
     print("Repoflow initialized")
 
-    hide_folder_windows(repo_path)
+# state.bin: magic, then one fixed-size record per file followed by its path
+STATE_MAGIC = b"RFS1"
+STATE_RECORD = struct.Struct(f"<{hashlib.new(HASH_ALGORITHM).digest_size}sqQH")
+
+def encode_state(state):
+    parts = [STATE_MAGIC]
+    for rel_path, entry in state.items():
+        path_bytes = rel_path.encode("utf-8")
+        mtime_ns = entry["mtime_ns"]
+        parts.append(STATE_RECORD.pack(
+            bytes.fromhex(entry["hash"]),
+            -1 if mtime_ns is None else mtime_ns,
+            entry["size"],
+            len(path_bytes)
+        ))
+        parts.append(path_bytes)
+    return b"".join(parts)
+
+def decode_state(raw):
+    view = memoryview(raw)
+    if view[:len(STATE_MAGIC)] != STATE_MAGIC:
+        raise ValueError("not a Repoflow state file")
+
+    state = {}
+    offset = len(STATE_MAGIC)
+    record_size = STATE_RECORD.size
+    while offset < len(view):
+        hash_bytes, mtime_ns, size, path_len = STATE_RECORD.unpack_from(view, offset)
+        offset += record_size
+        rel_path = str(view[offset:offset + path_len], "utf-8")
+        offset += path_len
+        state[rel_path] = {
+            "hash": hash_bytes.hex(),
+            "mtime_ns": None if mtime_ns == -1 else mtime_ns,
+            "size": size
+        }
+    return state
+
+def find_state_file(project_dir):
+    """Return the path of state.bin (or a legacy state.json), or None."""
+    for name in ("state.bin", "state.json"):
+        state_path = os.path.join(project_dir, ".repoflow", name)
+        if os.path.exists(state_path):
+            return state_path
+    return None
 
 def load_state(project_dir):
-    state_path = os.path.join(project_dir, ".repoflow", "state.json")
-    if not os.path.exists(state_path):
+    state_path = find_state_file(project_dir)
+    if state_path is None:
         return {}
-    with open(state_path, "r") as f:
-        return json.load(f)
+    if state_path.endswith(".json"):
+        return load_json(state_path)
+    with open(state_path, "rb") as f:
+        return decode_state(f.read())
 
 def status_repo():
     project_dir = os.getcwd()
 
-    old_state = load_state(project_dir)
-    current_files = collect_files(project_dir)
-
-    current_state = {}
-    for rel_path in current_files:
-        abs_path = os.path.join(project_dir, rel_path)
-        if os.path.isfile(abs_path):
-            current_state[rel_path] = compute_file_hash(abs_path)
-
-    added = []
-    modified = []
-    deleted = []
-
-    for path, hash_val in current_state.items():
-        if path not in old_state:
-            added.append(path)
-        elif old_state[path] != hash_val:
-            modified.append(path)
-
-    for path in old_state:
-        if path not in current_state:
-            deleted.append(path)
+    added, modified, deleted, _ = get_changes(project_dir)
 
     if not added and not modified and not deleted:
         print("Working tree clean.")
@@ -278,73 +695,171 @@ def read_file(path):
         lines = f.read().split("\n")
     return ["\n" if line == "" else line for line in lines]
 
-def compute_file_hash(file_path, chunk_size=8192):
-    """Return SHA-256 hash of a file."""
-    hasher = hashlib.sha256()
-    with open(file_path, "rb") as f:
+# files above this are hashed from an mmap in a single update() call
+MMAP_HASH_THRESHOLD = 1024 * 1024
+
+def compute_file_hash(file_path, chunk_size=1024 * 1024, size=None):
+    """
+    Return HASH_ALGORITHM (SHA-256) hash of a file.
+    size is the file size if the caller already has it (saves an fstat).
+    """
+    with open(file_path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        if size is None:
+            size = os.fstat(fd).st_size
+
+        # large files: one C-level update over the mapping, no read loop.
+        # Not on Windows, where a mapped file can't be replaced or deleted.
+        # Trade-off: if the file is truncated while mapped, touching the
+        # missing pages raises SIGBUS and kills the process instead of
+        # raising an exception.
+        if size > MMAP_HASH_THRESHOLD and not sys.platform.startswith("win"):
+            # we read front to back: let the kernel prefetch aggressively
+            if hasattr(os, "posix_fadvise"):
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError:
+                    pass
+
+            hasher = hashlib.new(HASH_ALGORITHM)
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                hasher.update(mm)
+            return hasher.hexdigest()
+
+        # Python 3.11+: let hashlib run the read loop
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, HASH_ALGORITHM).hexdigest()
+
+        hasher = hashlib.new(HASH_ALGORITHM)
         while True:
             chunk = f.read(chunk_size)
             if not chunk:
                 break
             hasher.update(chunk)
-    return hasher.hexdigest()
-
+        return hasher.hexdigest()
+
+def entry_hash(entry):
+    """Return the file hash from a state entry (older states store bare hashes)."""
+    if isinstance(entry, str):
+        return entry
+    return entry["hash"]
+
+# files touched this recently may change again within the same
+# timestamp tick, so their stat is not trusted by the hash cache
+RACY_WINDOW_NS = 2_000_000_000
+
+def make_state_entry(file_hash, st, racy_cutoff):
+    return {
+        "hash": file_hash,
+        "mtime_ns": st.st_mtime_ns if st.st_mtime_ns < racy_cutoff else None,
+        "size": st.st_size
+    }
 
-def build_state(project_dir, files_included):
+def hash_files(project_dir, rel_paths, old_state=None, stats=None):
     """
-    Build state.json mapping:
-    relative_path -> file_hash
+    Hash many files concurrently.
+    Returns relative_path -> {"hash", "mtime_ns", "size"}, skipping paths
+    that are not files.
+
+    If old_state has an entry whose mtime_ns and size still match the file,
+    its hash is reused without reading the file. stats (relative_path ->
+    os.stat_result, from collect_file_stats) saves the per-file stat call.
     """
-    state = {}
+    old_state = old_state or {}
+    stats = stats or {}
 
-    for rel_path in files_included:
+    racy_cutoff = time.time_ns() - RACY_WINDOW_NS
+
+    def hash_one(rel_path):
         abs_path = os.path.join(project_dir, rel_path)
+        st = stats.get(rel_path)
+        if st is None:
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                return rel_path, None
+        if not stat.S_ISREG(st.st_mode):
+            return rel_path, None
 
-        if not os.path.isfile(abs_path):
-            continue
+        old = old_state.get(rel_path)
+        if (
+            isinstance(old, dict)
+            and old.get("mtime_ns") == st.st_mtime_ns
+            and old.get("size") == st.st_size
+        ):
+            return rel_path, old
+
+        file_hash = compute_file_hash(abs_path, size=st.st_size)
+        return rel_path, make_state_entry(file_hash, st, racy_cutoff)
 
-        file_hash = compute_file_hash(abs_path)
-        state[rel_path] = file_hash
+    # hashlib releases the GIL while hashing, so threads overlap I/O and CPU
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
 
-    state_path = os.path.join(project_dir, ".repoflow", "state.json")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(hash_one, rel_paths)
+        return {path: entry for path, entry in results if entry is not None}
 
-    atomic_write_json(state_path, state)
+
+def build_state(project_dir, files_included, stats=None):
+    """
+    Build state.bin mapping:
+    relative_path -> {"hash", "mtime_ns", "size"}
+    """
+    state = hash_files(project_dir, files_included, stats=stats)
+
+    save_state(project_dir, state)
 
     return state
 
+def scan_current_state(project_dir, old_state=None):
+    """
+    Return {relative_path: state_entry} for every tracked file in the
+    working tree: one walk, then the parallel (stat-cached) hasher.
+    """
+    stats = collect_file_stats(project_dir)
+    return hash_files(project_dir, list(stats), old_state, stats)
+
 def get_changes(project_dir):
     old_state = load_state(project_dir)
-    current_files = collect_files(project_dir)
+    current_state = scan_current_state(project_dir, old_state)
 
-    current_state = {}
-    for rel_path in current_files:
-        abs_path = os.path.join(project_dir, rel_path)
-        if os.path.isfile(abs_path):
-            current_state[rel_path] = compute_file_hash(abs_path)
+    current_paths = current_state.keys()
+    old_paths = old_state.keys()
 
-    added, modified, deleted = [], [], []
+    added = sorted(current_paths - old_paths)
+    deleted = sorted(old_paths - current_paths)
+    modified = sorted(
+        path for path in current_paths & old_paths
+        if entry_hash(old_state[path]) != current_state[path]["hash"]
+    )
 
-    for path, hash_val in current_state.items():
-        if path not in old_state:
-            added.append(path)
-        elif old_state[path] != hash_val:
-            modified.append(path)
+    return added, modified, deleted, current_state
 
-    for path in old_state:
-        if path not in current_state:
-            deleted.append(path)
+def get_log_path(repo_path):
+    """
+    Return the path of the append-only commit log (log.jsonl, one commit
+    per line), converting a legacy log.json array on first use.
+    """
+    log_path = os.path.join(repo_path, "log.jsonl")
+    legacy_path = os.path.join(repo_path, "log.json")
 
-    return added, modified, deleted, current_state
+    if os.path.exists(legacy_path) and not os.path.exists(log_path):
+        log = load_json(legacy_path)
+        atomic_write_bytes(log_path, b"".join(dump_json_line(commit) for commit in log))
+        os.remove(legacy_path)
+
+    return log_path
+
+def count_commits(log_path):
+    with open(log_path, "rb") as f:
+        return sum(1 for line in f if line.strip())
 
 def get_next_commit_id(repo_path):
-    log_path = os.path.join(repo_path, "log.json")
+    log_path = get_log_path(repo_path)
     if not os.path.exists(log_path):
         return 1
 
-    with open(log_path, "r") as f:
-        log = json.load(f)
-
-    return len(log) + 1
+    return count_commits(log_path) + 1
 
 def save_commit_diff(repo_path, commit_id, added, modified, deleted):
     diff = {
@@ -354,10 +869,10 @@ def save_commit_diff(repo_path, commit_id, added, modified, deleted):
     }
 
     diff_path = os.path.join(repo_path, "diffs", f"c{commit_id}.json")
-    with open(diff_path, "w") as f:
-        json.dump(diff, f, indent=4)
+    atomic_write_json(diff_path, diff)
 
 def read_lines(path):
+    # difflib's SequenceMatcher needs random access, so this stays a list
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         return f.readlines()
 
@@ -371,57 +886,33 @@ def generate_diff(old_lines, new_lines, file_path):
     )
 
 
-def update_head(project_dir, added, modified, deleted):
-    head_dir = os.path.join(project_dir, ".repoflow", "commits", "head")
-    base_dir = os.path.join(project_dir, ".repoflow", "commits", "base")
+def update_head(project_dir, added, modified, deleted, current_state):
+    repo_path = os.path.join(project_dir, ".repoflow")
 
     # Create HEAD from base if missing
-    if not os.path.exists(head_dir):
-        shutil.copytree(base_dir, head_dir)
+    head = load_manifest(repo_path, "head")
+    if head is None:
+        head = dict(load_manifest(repo_path, "base") or {})
 
     # Handle added + modified files
     for path in added + modified:
         src = os.path.join(project_dir, path)
-        dst = os.path.join(head_dir, path)
-
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-
-        # 🔐 Windows-safe overwrite
-        if os.path.exists(dst):
-            try:
-                os.remove(dst)
-            except PermissionError:
-                print(f"⚠ Skipped locked file (HEAD not updated): {path}")
-                continue
 
         try:
-            shutil.copy2(src, dst)
+            file_hash = store_object(repo_path, src, current_state[path])
         except PermissionError:
             print(f"⚠ Skipped locked file (HEAD not updated): {path}")
+            continue
+
+        head[path] = file_hash
 
     # Handle deleted files
     for path in deleted:
-        target = os.path.join(head_dir, path)
+        head.pop(path, None)
 
-        if os.path.isfile(target):
-            try:
-                os.remove(target)
-            except PermissionError:
-                print(f"⚠ Could not delete locked file from HEAD: {path}")
-                continue
+    save_manifest(repo_path, "head", head)
 
-            # Cleanup empty parent dirs
-            parent = os.path.dirname(target)
-            while (
-                parent
-                and parent != head_dir
-                and os.path.isdir(parent)
-                and not os.listdir(parent)
-            ):
-                os.rmdir(parent)
-                parent = os.path.dirname(parent)
-
-def force_remove(path):
+def remove_tree(path):
     def onerror(func, p, exc):
         try:
             os.chmod(p, 0o777)  # remove read-only
@@ -429,27 +920,82 @@ def force_remove(path):
         except Exception:
             print(f"⚠ Could not remove locked file: {p}")
 
+    # rm is a single C process, much faster than walking the tree in Python
+    if os.name == "posix":
+        try:
+            subprocess.run(["rm", "-rf", path])
+        except OSError:
+            pass  # no usable rm: fall through to shutil.rmtree
+
     if os.path.exists(path):
         shutil.rmtree(path, onerror=onerror)
 
+def force_remove(path):
+    """
+    Remove a directory tree without making the caller wait for it.
+    The tree is renamed to a tombstone (instant), then deleted on a
+    background thread that still finishes before the process exits.
+    """
+    if not os.path.exists(path):
+        return
+
+    trash_path = f"{path}{TRASH_SUFFIX}{os.getpid()}"
+    try:
+        os.rename(path, trash_path)
+    except OSError:
+        # e.g. a file inside is open on Windows: delete in place instead
+        remove_tree(path)
+        return
+
+    threading.Thread(target=remove_tree, args=(trash_path,)).start()
+
+def sweep_trash(project_dir):
+    """
+    Delete tombstones left behind by an interrupted force_remove.
+    Our own tombstone (if a deletion is in flight) is left alone.
+    """
+    prefix = FOLDER_NAME + TRASH_SUFFIX
+    own_name = f"{prefix}{os.getpid()}"
+
+    try:
+        with os.scandir(project_dir) as it:
+            stale = [
+                entry.path for entry in it
+                if entry.name.startswith(prefix)
+                and entry.name != own_name
+                and entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return
+
+    for path in stale:
+        remove_tree(path)
+
 def diff_file(rel_path):
     project_dir = os.getcwd()
     rel_path = normalize(rel_path)
-    head_root = os.path.join(project_dir, ".repoflow", "commits", "head")
-    if not os.path.exists(head_root):
+    repo_path = os.path.join(project_dir, ".repoflow")
+    head = load_manifest(repo_path, "head")
+    if head is None:
         print("No commits yet. Nothing to diff against.")
         return
 
-    head_path = os.path.join(project_dir, ".repoflow", "commits", "head", rel_path)
+    head_hash = head.get(rel_path)
+    head_path = object_path(repo_path, head_hash) if head_hash else None
     work_path = os.path.join(project_dir, rel_path)
 
-    head_exists = os.path.isfile(head_path)
+    head_exists = head_path is not None and os.path.isfile(head_path)
     work_exists = os.path.isfile(work_path)
 
     if not head_exists and not work_exists:
         print("File not found in HEAD or working tree.")
         return
 
+    # identical content: skip reading and diffing both files
+    if head_exists and work_exists and compute_file_hash(work_path) == head_hash:
+        print("No differences.")
+        return
+
     old_lines = read_lines(head_path) if head_exists else []
     new_lines = read_lines(work_path) if work_exists else []
 
@@ -464,15 +1010,9 @@ def diff_file(rel_path):
         print("No differences.")
 
 def update_log(repo_path, commit_id, message, added, modified, deleted):
-    log_path = os.path.join(repo_path, "log.json")
+    log_path = get_log_path(repo_path)
 
-    if os.path.exists(log_path):
-        with open(log_path, "r") as f:
-            log = json.load(f)
-    else:
-        log = []
-
-    log.append({
+    entry = dump_json_line({
         "id": commit_id,
         "timestamp": datetime.datetime.now().isoformat(),
         "message": message,
@@ -483,11 +1023,18 @@ def update_log(repo_path, commit_id, message, added, modified, deleted):
         }
     })
 
-    atomic_write_json(log_path, log)
+    # O(1) append instead of rewriting the whole history
+    with open(log_path, "ab") as f:
+        f.write(entry)
 
 def save_state(project_dir, state):
-    state_path = os.path.join(project_dir, ".repoflow", "state.json")
-    atomic_write_json(state_path, state)
+    state_path = os.path.join(project_dir, ".repoflow", "state.bin")
+    atomic_write_bytes(state_path, encode_state(state))
+
+    # drop the pre-binary state file once state.bin supersedes it
+    legacy_path = os.path.join(project_dir, ".repoflow", "state.json")
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
 
 def commit_repo(message="Commit"):
     project_dir = os.getcwd()
@@ -502,7 +1049,7 @@ def commit_repo(message="Commit"):
     commit_id = get_next_commit_id(repo_path)
 
     save_commit_diff(repo_path, commit_id, added, modified, deleted)
-    update_head(project_dir, added, modified, deleted)
+    update_head(project_dir, added, modified, deleted, current_state)
     save_state(project_dir, current_state)
     update_log(repo_path, commit_id, message, added, modified, deleted)
 
@@ -514,20 +1061,22 @@ def commit_repo(message="Commit"):
 def log_repo():
     project_dir = os.getcwd()
     repo_path = os.path.join(project_dir, ".repoflow")
-    log_path = os.path.join(repo_path, "log.json")
+    log_path = get_log_path(repo_path)
 
     if not os.path.exists(log_path):
         print("No Commits yet")
         return
 
-    with open(log_path, "r") as f:
-        log = json.load(f)
+    with open(log_path, "rb") as f:
+        lines = [line for line in f if line.strip()]
 
-    if not log:
+    if not lines:
         print("No Commits yet")
         return
 
-    for commit in reversed(log):
+    # newest first; each line is only parsed when it is printed
+    for line in reversed(lines):
+        commit = parse_json(line)
         print(f"commit c{commit['id']}")
         print(f"Date: {commit['timestamp']}")
         print()
@@ -555,28 +1104,24 @@ def log_repo():
 
 def ensure_restore_safe(project_dir):
     repo_path = os.path.join(project_dir, ".repoflow")
-    head_path = os.path.join(project_dir, ".repoflow", "commits", "head")
 
     if not os.path.exists(repo_path):
         print("Repoflow not Initialized yet")
         return False
 
-    if not os.path.exists(head_path):
+    if load_manifest(repo_path, "head") is None:
         print("No commits yet, nothing to restore")
         return False
 
     return True
 
 def collect_tracked_files(project_dir):
-    state_path = os.path.join(project_dir, ".repoflow", "state.json")
-
-    if not os.path.exists(state_path):
+    if find_state_file(project_dir) is None:
         print("State file missing. Cannot restore.")
         return None
 
     try:
-        with open(state_path, "r") as f:
-            state = json.load(f)
+        state = load_state(project_dir)
     except Exception:
         print("State file is corrupted. Cannot restore.")
         return None
@@ -588,16 +1133,13 @@ def cleanup_working_tree(project_dir):
     Remove ONLY tracked files.
     Never touch .git, .repoflow, or ignored paths.
     """
-    state_path = os.path.join(project_dir, ".repoflow", "state.json")
-
-    if not os.path.exists(state_path):
+    if find_state_file(project_dir) is None:
         print("State file missing. Cannot cleanup.")
         return
 
-    with open(state_path, "r", encoding="utf-8") as f:
-        state = json.load(f)
+    state = load_state(project_dir)
 
-    ignore_rules = load_ignore_rules(project_dir)
+    matcher = load_ignore_matcher(project_dir)
 
     for rel_path in state.keys():
         rel_path = normalize(rel_path)
@@ -607,7 +1149,7 @@ def cleanup_working_tree(project_dir):
             continue
         if rel_path.startswith(".repoflow/"):
             continue
-        if should_ignore(rel_path, ignore_rules):
+        if should_ignore(rel_path, matcher):
             continue
 
         abs_path = os.path.join(project_dir, rel_path)
@@ -631,74 +1173,61 @@ def cleanup_working_tree(project_dir):
             print(f"⚠ Skipped locked file: {rel_path}")
 
 def restore_head_snapshot(project_dir):
-    head_dir = os.path.join(project_dir, ".repoflow", "commits", "head")
+    repo_path = os.path.join(project_dir, ".repoflow")
+    head = load_manifest(repo_path, "head")
 
-    if not os.path.exists(head_dir):
+    if head is None:
         print("No HEAD snapshot found.")
         return
 
-    for root, _, files in os.walk(head_dir):
-        rel_root = normalize(os.path.relpath(root, head_dir))
-        if rel_root == ".":
-            rel_root = ""
-
-        for file in files:
-            src = os.path.join(root, file)
-            dst = os.path.join(project_dir, rel_root, file)
-
-            os.makedirs(os.path.dirname(dst), exist_ok=True)
-            shutil.copy2(src, dst)
+    for rel_path, file_hash in head.items():
+        materialize(repo_path, file_hash, os.path.join(project_dir, rel_path))
 
 def restore_base_snapshot(project_dir):
-    base_dir = os.path.join(project_dir, ".repoflow", "commits", "base")
-    ignore_rules = load_ignore_rules(project_dir)
+    """
+    Copy the base snapshot into the working tree.
+    Returns relative_path -> file_hash for every file written.
+    """
+    repo_path = os.path.join(project_dir, ".repoflow")
+    base = load_manifest(repo_path, "base")
+    matcher = load_ignore_matcher(project_dir)
 
-    if not os.path.exists(base_dir):
+    if base is None:
         print("Base snapshot missing.")
-        return
-
-    for root, dirs, files in os.walk(base_dir):
-        rel_root = normalize(os.path.relpath(root, base_dir))
-        if rel_root == ".":
-            rel_root = ""
-
-        # 🚫 prune ignored directories
-        dirs[:] = [
-            d for d in dirs
-            if not should_ignore(normalize(os.path.join(rel_root, d)), ignore_rules)
-        ]
-
-        for file in files:
-            rel_path = normalize(os.path.join(rel_root, file))
+        return {}
 
-            if should_ignore(rel_path, ignore_rules):
-                continue
+    restored = {}
+    for rel_path, file_hash in base.items():
+        # 🚫 skip ignored files and anything under an ignored directory
+        if should_ignore_with_parents(rel_path, matcher):
+            continue
 
-            src = os.path.join(root, file)
-            dst = os.path.join(project_dir, rel_path)
+        materialize(repo_path, file_hash, os.path.join(project_dir, rel_path))
+        restored[rel_path] = file_hash
 
-            os.makedirs(os.path.dirname(dst), exist_ok=True)
-            shutil.copy2(src, dst)
+    return restored
 
 def apply_diff(project_dir, commit_id):
     """
     Apply diff cN.json to working tree.
     For v1: only DELETIONS are applied.
     Base snapshot already contains full file content.
+    Returns the relative paths that the diff deletes.
     """
     repo_path = os.path.join(project_dir, ".repoflow")
     diff_path = os.path.join(repo_path, "diffs", f"c{commit_id}.json")
 
     if not os.path.exists(diff_path):
         print(f"Diff c{commit_id} not found.")
-        return
+        return []
 
-    with open(diff_path, "r") as f:
-        diff = json.load(f)
+    diff = load_json(diff_path)
+    deleted = []
 
     for rel_path in diff.get("deleted", []):
         rel_path = normalize(rel_path)
         abs_path = os.path.join(project_dir, rel_path)
+        deleted.append(rel_path)
 
         if os.path.isfile(abs_path):
             os.remove(abs_path)
@@ -713,91 +1242,78 @@ def apply_diff(project_dir, commit_id):
                 os.rmdir(parent)
                 parent = os.path.dirname(parent)
 
-def rebuild_state_from_working_tree(project_dir):
-    files = collect_files(project_dir)
-    state = {}
-
-    for rel_path in files:
-        abs_path = os.path.join(project_dir, rel_path)
-        if os.path.isfile(abs_path):
-            state[rel_path] = compute_file_hash(abs_path)
-
-    save_state(project_dir, state)
+    return deleted
 
 def restore_to_commit(project_dir, target_commit):
     repo_path = os.path.join(project_dir, ".repoflow")
-    base_dir = os.path.join(repo_path, "commits", "base")
 
-    if not os.path.exists(base_dir):
+    if load_manifest(repo_path, "base") is None:
         print("Base snapshot missing. Cannot restore.")
         return
 
     cleanup_working_tree(project_dir)
 
-    restore_base_snapshot(project_dir)
+    restored = restore_base_snapshot(project_dir)
 
     for commit_id in range(1, target_commit + 1):
-        apply_diff(project_dir, commit_id)
+        for rel_path in apply_diff(project_dir, commit_id):
+            restored.pop(rel_path, None)
 
-    rebuild_state_from_working_tree(project_dir)
+    # every restored file came from a known object, so no re-hashing:
+    # only stat them to seed the mtime/size cache
+    racy_cutoff = time.time_ns() - RACY_WINDOW_NS
+    state = {}
+    for rel_path, file_hash in restored.items():
+        try:
+            st = os.stat(os.path.join(project_dir, rel_path))
+        except OSError:
+            continue
+        state[rel_path] = make_state_entry(file_hash, st, racy_cutoff)
+    save_state(project_dir, state)
 
-    reset_head_from_working_tree(project_dir)
+    reset_head_from_state(project_dir)
 
     print(f"✔ Restored to commit c{target_commit}")
 
 
-def reset_head_from_working_tree(project_dir):
+def reset_head_from_state(project_dir):
     """
-    Rebuild HEAD snapshot from working tree.
-    Uses collect_files() so ignored files are NOT tracked.
+    Rebuild HEAD manifest from the saved state.
+    After a restore that state holds exactly the restored (non-ignored)
+    base files, so HEAD matches what was restored.
     """
-    head_dir = os.path.join(project_dir, ".repoflow", "commits", "head")
-
-    if os.path.exists(head_dir):
-        shutil.rmtree(head_dir)
+    repo_path = os.path.join(project_dir, ".repoflow")
+    head = {}
 
-    files = collect_files(project_dir)
+    for rel_path, entry in load_state(project_dir).items():
+        head[rel_path] = store_object(repo_path, os.path.join(project_dir, rel_path), entry)
 
-    for rel_path in files:
-        src = os.path.join(project_dir, rel_path)
-        dst = os.path.join(head_dir, rel_path)
-
-        os.makedirs(os.path.dirname(dst), exist_ok=True)
-        shutil.copy2(src, dst)
+    save_manifest(repo_path, "head", head)
 
 def validate_commit(repo_path, commit_id):
-    log_path = os.path.join(repo_path, "log.json")
+    log_path = get_log_path(repo_path)
 
     if not os.path.exists(log_path):
         print("No commits found.")
         return False
 
-    with open(log_path, "r") as f:
-        log = json.load(f)
-
     try:
         cid = int(commit_id.lstrip("c"))
     except ValueError:
         print("Invalid commit id format.")
         return False
 
-    if cid < 1 or cid > len(log):
+    if cid < 1 or cid > count_commits(log_path):
         print("Commit does not exist.")
         return False
 
     return cid
 
 def restore_base(project_dir):
-    base_dir = os.path.join(project_dir, ".repoflow", "commits", "base")
-
-    for root, _, files in os.walk(base_dir):
-        for file in files:
-            src = os.path.join(root, file)
-            rel = os.path.relpath(src, base_dir)
-            dst = os.path.join(project_dir, rel)
+    repo_path = os.path.join(project_dir, ".repoflow")
 
-            os.makedirs(os.path.dirname(dst), exist_ok=True)
-            shutil.copy2(src, dst)
+    for rel_path, file_hash in (load_manifest(repo_path, "base") or {}).items():
+        materialize(repo_path, file_hash, os.path.join(project_dir, rel_path))
 
 def restore_repo(commit_id, force=False):
     project_dir = os.getcwd()
@@ -820,26 +1336,24 @@ def unhide_windows(path):
         return
     subprocess.run(["attrib", "-H", path], shell=True)
 
+    if os.path.isdir(path):
+        subprocess.run(["attrib", "-H", "/S", "/D", os.path.join(path, "*")], shell=True)
+
 def destroy_repo():
     project_dir = os.getcwd()
 
     repo_path = os.path.join(project_dir, FOLDER_NAME)
     ignore_path = os.path.join(project_dir, IGNORE_FILE)
 
+    sweep_trash(project_dir)
+
     if not os.path.exists(repo_path) and not os.path.exists(ignore_path):
         print("Repoflow not initialized.")
         return
 
     if os.path.exists(repo_path):
         unhide_windows(repo_path)
-
-        for root, dirs, files in os.walk(repo_path):
-            for d in dirs:
-                unhide_windows(os.path.join(root, d))
-            for f in files:
-                unhide_windows(os.path.join(root, f))
-
-        shutil.rmtree(repo_path)
+        force_remove(repo_path)
 
     if os.path.exists(ignore_path):
         unhide_windows(ignore_path)